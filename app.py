@@ -1,13 +1,18 @@
 import os
+import click
 from uuid import uuid4
 from typing import Optional
-from flask import Flask, render_template, redirect, url_for, request, session, flash, abort
+from flask import Flask, render_template, stream_template, redirect, url_for, request, session, flash, abort, get_flashed_messages, g
+from flask_wtf.csrf import generate_csrf
 from werkzeug.utils import secure_filename
+from werkzeug.local import LocalProxy
 from config import Config
 from extensions import db, csrf
+from routing import init_read_routing
 from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import or_, func
+from sqlalchemy.orm import joinedload
 
 app = Flask(__name__)
 app.config.from_object(Config)
@@ -18,12 +23,23 @@ os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 db.init_app(app)
 csrf.init_app(app)
 
-from models import (Education, Experience, Skill, Project, Comment, About, SocialLink, User, ProjectComment, ProjectRating)
+from models import (Education, Experience, Skill, Project, Comment, About, SocialLink, User, ProjectComment, ProjectRating, RelatedProject, ProjectRanking)
 from forms import (ProjectForm, CommentForm, AboutForm, SocialLinkForm, EducationForm, ExperienceForm,RegisterForm, UserLoginForm, ProjectCommentForm, ProjectRatingForm)
 
+from archive import archive_old_messages, search_archive, archive_stats
+from sessions import SqliteSessionInterface
+from rankings import compute_related_projects, rebuild_rankings
+from fragments import init_fragment_cache, load_project_fragments, is_cached
+
 with app.app_context():
     db.create_all()
 
+init_read_routing(app, db)
+init_fragment_cache(app)
+
+if app.config["SERVER_SIDE_SESSIONS"]:
+    app.session_interface = SqliteSessionInterface(db)
+
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp"}
 
 def allowed_file(filename: str) -> bool:
@@ -42,13 +58,32 @@ def save_uploaded_image(file_obj) -> Optional[str]:
     file_obj.save(os.path.join(app.config["UPLOAD_FOLDER"], stored_name))
     return stored_name
 
+def render_list_page(template: str, needs_csrf: bool, **context):
+    """
+    Streams long list pages when STREAM_LIST_PAGES is on, so the header and
+    first rows are sent before the whole list has been read from the database.
+    needs_csrf: whether the page will render a CSRF token for this visitor.
+    """
+    if not app.config["STREAM_LIST_PAGES"]:
+        return render_template(template, **context)
+
+    # The session cookie is sent with the headers, so anything the templates
+    # would store in it (flashes, CSRF token) has to happen before streaming.
+    get_flashed_messages(with_categories=True)
+    if needs_csrf:
+        generate_csrf()
+    return stream_template(template, **context)
+
 # AUTH HELPERS
 def is_admin() -> bool:
     return bool(session.get("is_admin"))
 
 def current_user_obj():
-    user_id = session.get("user_id")
-    return User.query.get(user_id) if user_id else None
+    # Loaded at most once per request, however often it is used
+    if "current_user" not in g:
+        user_id = session.get("user_id")
+        g.current_user = db.session.get(User, user_id) if user_id else None
+    return g.current_user
 
 def can_manage_resource(owner_user_id: Optional[int]) -> bool:
     """
@@ -137,15 +172,11 @@ def user_logout():
     flash("Logged out.", "success")
     return redirect(url_for("home"))
 
-@app.context_processor
-def inject_admin():
-    return dict(is_admin=session.get('is_admin', False))
-
-@app.context_processor
-def inject_user():
-    user_id = session.get("user_id")
-    user = User.query.get(user_id) if user_id else None
-    return dict(current_user=user)
+# Lazy template globals: nothing is looked up until a template uses them
+app.jinja_env.globals.update(
+    is_admin=LocalProxy(is_admin),
+    current_user=LocalProxy(current_user_obj),
+)
 
 # -- HOME --
 
@@ -352,6 +383,11 @@ def delete_skill(id):
 
 # -- PROJECTS --
 
+PROJECT_SORTS = {
+    "top": (ProjectRanking.avg_rating.desc(), ProjectRanking.rating_count.desc()),
+    "discussed": (ProjectRanking.comment_count.desc(),),
+}
+
 @app.route('/projects')
 def projects():
     q = request.args.get("q", "").strip()
@@ -367,8 +403,17 @@ def projects():
             )
         )
 
-    projects_list = query.order_by(Project.id.desc()).all()
-    return render_template("projects.html", data=projects_list, q=q)
+    sort = request.args.get("sort", "newest")
+    if sort in PROJECT_SORTS:
+        # Rankings are precomputed, so this is a join on an indexed column
+        query = query.outerjoin(ProjectRanking, ProjectRanking.project_id == Project.id)
+        query = query.order_by(*PROJECT_SORTS[sort])
+    else:
+        sort = "newest"
+
+    projects_list = query.order_by(Project.id.desc()).yield_per(app.config["LIST_PAGE_BATCH_SIZE"])
+    # Only the admin's edit/delete buttons carry a CSRF token on this page
+    return render_list_page("projects.html", needs_csrf=is_admin(), data=projects_list, q=q, sort=sort)
 
 @app.route('/add-project', methods=['GET', 'POST'])
 def add_project():
@@ -449,16 +494,6 @@ def project_detail(project_id):
 
     user_id = session.get("user_id")
 
-    # Average rating
-    avg_rating = db.session.query(func.avg(ProjectRating.rating)).filter_by(project_id=project_id).scalar()
-    avg_rating = round(float(avg_rating), 1) if avg_rating is not None else None
-
-    # Current user's rating (if any)
-    my_rating = None
-    if user_id:
-        existing = ProjectRating.query.filter_by(project_id=project_id, user_id=user_id).first()
-        my_rating = existing.rating if existing else None
-
     # Handle comment submit
     if comment_form.validate_on_submit() and request.form.get("form_name") == "comment":
         if not user_id:
@@ -486,18 +521,50 @@ def project_detail(project_id):
         flash("Rating saved!")
         return redirect(url_for("project_detail", project_id=project_id))
 
-    comments = ProjectComment.query.filter_by(project_id=project_id).order_by(ProjectComment.created_at.desc()).all()
+    fragment_keys = load_project_fragments(project_id)
+
+    # Current user's rating (if any)
+    my_rating = None
+    if user_id:
+        existing = ProjectRating.query.filter_by(project_id=project_id, user_id=user_id).first()
+        my_rating = existing.rating if existing else None
+
+    # Cached fragments don't need their data loaded
+    avg_rating = None
+    if not is_cached(fragment_keys["rating"]):
+        avg_rating = db.session.query(func.avg(ProjectRating.rating)).filter_by(project_id=project_id).scalar()
+        avg_rating = round(float(avg_rating), 1) if avg_rating is not None else None
+
+    comments = []
+    if not is_cached(fragment_keys["comments"]):
+        comments = ProjectComment.query.filter_by(project_id=project_id).order_by(ProjectComment.created_at.desc()).all()
+
+    related_projects = (
+        Project.query.join(RelatedProject, RelatedProject.related_id == Project.id)
+        .filter(RelatedProject.project_id == project_id)
+        .order_by(RelatedProject.score.desc())
+        .all()
+    )
 
     return render_template(
         "project_detail.html",
         project=project,
+        fragment_keys=fragment_keys,
         comments=comments,
+        related_projects=related_projects,
         avg_rating=avg_rating,
         my_rating=my_rating,
         comment_form=comment_form,
         rating_form=rating_form,
     )
 
+@app.cli.command("precompute-projects")
+def precompute_projects_command():
+    """Rebuild related projects (TF-IDF similarity) and the rating/comment rankings."""
+    related = compute_related_projects(app.config["RELATED_PROJECTS_COUNT"])
+    ranked = rebuild_rankings()
+    print(f"Stored {related} related-project links and ranked {ranked} projects.")
+
 # USER EDIT/DELETE ON PROJECT COMMENTS
 
 @app.route("/project-comment/<int:comment_id>/edit", methods=["GET", "POST"])
@@ -538,7 +605,6 @@ def delete_project_comment(comment_id):
 @app.route('/contact', methods=['GET', 'POST'])
 def contact():
     form = CommentForm()
-    comments = Comment.query.order_by(Comment.created_at.desc()).all()
     user = current_user_obj()
 
     if form.validate_on_submit():
@@ -563,8 +629,15 @@ def contact():
         db.session.commit()
         return redirect(url_for('contact'))
 
-    return render_template(
+    comments = (
+        Comment.query.options(joinedload(Comment.user))
+        .order_by(Comment.created_at.desc())
+        .yield_per(app.config["LIST_PAGE_BATCH_SIZE"])
+    )
+
+    return render_list_page(
         'contact.html',
+        needs_csrf=True,
         form=form,
         comments=comments
     )
@@ -644,5 +717,46 @@ def delete_reply(msg_id):
 
     return redirect(url_for('contact'))
 
+# -- MESSAGE ARCHIVE --
+
+ARCHIVE_PER_PAGE = 50
+
+@app.route('/admin/archive')
+def message_archive():
+    if not is_admin():
+        abort(403)
+
+    # Not "q": main.js strips forms with a q input (the old projects search)
+    q = request.args.get("search", "").strip()
+    page = max(request.args.get("page", 1, type=int), 1)
+
+    start = (page - 1) * ARCHIVE_PER_PAGE
+    # One extra match tells us whether there is a next page
+    results = search_archive(q, limit=start + ARCHIVE_PER_PAGE + 1)
+    stats = archive_stats()
+
+    return render_template(
+        'archive.html',
+        messages=results[start:start + ARCHIVE_PER_PAGE],
+        # Counting search matches would mean decompressing the whole archive
+        total=None if q else stats["rows"],
+        page=page,
+        has_next=len(results) > start + ARCHIVE_PER_PAGE,
+        q=q,
+        stats=stats,
+    )
+
+@app.cli.command("archive-messages")
+@click.option("--days", type=int, default=None, help="Archive replied messages older than this (default ARCHIVE_AFTER_DAYS).")
+def archive_messages_command(days):
+    """Move old, replied-to contact messages into the compressed archive."""
+    days = app.config["ARCHIVE_AFTER_DAYS"] if days is None else days
+    totals = archive_old_messages(days, app.config["ARCHIVE_BATCH_SIZE"])
+    print(
+        f"Archived {totals['rows']} messages older than {days} days: "
+        f"{totals['raw_bytes']} bytes of JSON compressed to {totals['stored_bytes']} bytes "
+        f"({totals['raw_bytes'] - totals['stored_bytes']} bytes saved)."
+    )
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,92 @@
+import json
+import zlib
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from extensions import db
+from models import Comment, MessageArchive
+
+
+def _message_to_dict(msg: Comment) -> dict:
+    return {
+        "id": msg.id,
+        "user_id": msg.user_id,
+        "name": msg.name,
+        "message": msg.message,
+        "reply": msg.reply,
+        "created_at": msg.created_at.isoformat() if msg.created_at else None,
+    }
+
+
+def archive_old_messages(max_age_days: int, batch_size: int = 500) -> dict:
+    """
+    Moves replied-to contact messages older than max_age_days out of the
+    Comment table into compressed MessageArchive rows (one per batch).
+    Returns the totals for this run.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+    totals = {"rows": 0, "raw_bytes": 0, "stored_bytes": 0}
+
+    while True:
+        batch = (
+            Comment.query.filter(Comment.created_at < cutoff, Comment.reply.isnot(None), Comment.reply != "")
+            .order_by(Comment.id.asc())
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+
+        payload = json.dumps([_message_to_dict(m) for m in batch]).encode("utf-8")
+        data = zlib.compress(payload, 9)
+        raw_bytes = len(payload)
+
+        db.session.add(MessageArchive(rows=len(batch), raw_bytes=raw_bytes, stored_bytes=len(data), data=data))
+        Comment.query.filter(Comment.id.in_([m.id for m in batch])).delete(synchronize_session=False)
+        db.session.commit()
+
+        totals["rows"] += len(batch)
+        totals["raw_bytes"] += raw_bytes
+        totals["stored_bytes"] += len(data)
+
+    return totals
+
+
+def unpack_archive(archive: MessageArchive) -> list:
+    messages = json.loads(zlib.decompress(archive.data).decode("utf-8"))
+    for msg in messages:
+        msg["created_at"] = datetime.fromisoformat(msg["created_at"]) if msg["created_at"] else None
+    return messages
+
+
+def search_archive(q: str = "", limit: int = 50) -> list:
+    """
+    Up to `limit` archived messages, most recently archived first,
+    optionally filtered by a case-insensitive match on name, message or
+    reply. Batches are only decompressed until the limit is reached.
+    """
+    q = q.lower()
+    results = []
+    for archive in MessageArchive.query.order_by(MessageArchive.id.desc()).yield_per(20):
+        for msg in reversed(unpack_archive(archive)):
+            if not q or any(q in (msg[key] or "").lower() for key in ("name", "message", "reply")):
+                results.append(msg)
+                if len(results) >= limit:
+                    return results
+    return results
+
+
+def archive_stats() -> dict:
+    rows, raw_bytes, stored_bytes, batches = db.session.query(
+        func.sum(MessageArchive.rows),
+        func.sum(MessageArchive.raw_bytes),
+        func.sum(MessageArchive.stored_bytes),
+        func.count(MessageArchive.id),
+    ).one()
+    raw_bytes, stored_bytes = raw_bytes or 0, stored_bytes or 0
+    return {
+        "batches": batches,
+        "rows": rows or 0,
+        "raw_bytes": raw_bytes,
+        "stored_bytes": stored_bytes,
+        "bytes_saved": raw_bytes - stored_bytes,
+    }
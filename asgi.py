@@ -0,0 +1,13 @@
+"""
+ASGI entry point, e.g.
+
+    uvicorn asgi:asgi_app --host 0.0.0.0 --port 8000
+
+The Flask app runs in a pool of ASGI_THREADS threads inside one process,
+so a slow write or upload ties up a thread rather than a whole worker
+process.
+"""
+from a2wsgi import WSGIMiddleware
+from app import app
+
+asgi_app = WSGIMiddleware(app, workers=app.config["ASGI_THREADS"])
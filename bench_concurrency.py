@@ -0,0 +1,173 @@
+"""
+Compares gunicorn sync workers with the ASGI entry point (asgi.py under
+uvicorn) at increasing numbers of concurrent connections.
+
+    python bench_concurrency.py --workers 4 --threads 20 --concurrency 1 8 32 64
+    python bench_concurrency.py --match-memory --threads 20
+
+For each server it prints the resident memory of the whole process tree,
+then requests/second, requests/second per 100 MB of that memory, median and
+95th percentile latency and errors at each concurrency level.
+
+--match-memory measures the uvicorn process first and sizes the gunicorn
+worker count to the same footprint, so both servers are compared at equal
+memory. Run it with the same DATABASE_URL you would deploy with.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+
+def tree_rss_mb(pid: int) -> float:
+    """Resident memory of a process and all of its children (Linux /proc)."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except OSError:
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+
+    total_kb, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+        except OSError:
+            pass
+    return total_kb / 1024
+
+
+def wait_until_up(url: str, timeout: float = 30) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=2).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start")
+
+
+def run_load(url: str, concurrency: int, duration: float) -> dict:
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def client():
+        while time.time() < stop_at:
+            start = time.perf_counter()
+            try:
+                urllib.request.urlopen(url, timeout=30).read()
+            except OSError:
+                with lock:
+                    errors[0] += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    pick = lambda q: latencies[int(q * (len(latencies) - 1))] * 1000 if latencies else float("nan")
+    return {
+        "rps": len(latencies) / duration,
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "errors": errors[0],
+    }
+
+
+def gunicorn_command(workers: int) -> list:
+    return [sys.executable, "-m", "gunicorn", "-w", str(workers), "-b", "127.0.0.1:8101", "app:app"]
+
+
+def uvicorn_command() -> list:
+    return [sys.executable, "-m", "uvicorn", "asgi:asgi_app", "--port", "8102", "--log-level", "warning"]
+
+
+def warm_rss_mb(command: list, port: int, path: str) -> float:
+    """Starts a server, warms it up and returns its resident memory."""
+    url = f"http://127.0.0.1:{port}{path}"
+    server = subprocess.Popen(command, cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up(url)
+        run_load(url, 4, 1)
+        return tree_rss_mb(server.pid)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def workers_for_memory(target_mb: float, path: str) -> int:
+    """gunicorn worker count whose footprint is closest to target_mb."""
+    one = warm_rss_mb(gunicorn_command(1), 8101, path)
+    two = warm_rss_mb(gunicorn_command(2), 8101, path)
+    per_worker = max(two - one, 1.0)
+    master = one - per_worker
+    workers = max(1, round((target_mb - master) / per_worker))
+    print(f"gunicorn: ~{master:.1f} MB master + ~{per_worker:.1f} MB per worker "
+          f"-> {workers} worker(s) for {target_mb:.1f} MB")
+    return workers
+
+
+def benchmark(name: str, command: list, port: int, args) -> float:
+    url = f"http://127.0.0.1:{port}{args.path}"
+    server = subprocess.Popen(command, cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up(url)
+        run_load(url, 2, 1)  # warm up
+        rss = tree_rss_mb(server.pid)
+        print(f"\n{name}: {rss:.1f} MB resident")
+        print(f"{'conns':>6} {'req/s':>8} {'/100MB':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+        for concurrency in args.concurrency:
+            r = run_load(url, concurrency, args.duration)
+            per_100mb = r["rps"] * 100 / rss
+            print(f"{concurrency:>6} {r['rps']:>8.1f} {per_100mb:>8.1f} {r['p50']:>8.1f} {r['p95']:>8.1f} {r['errors']:>7}")
+        rss = tree_rss_mb(server.pid)
+        print(f"{'':>6} {rss:.1f} MB resident after load")
+        return rss
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/", help="Page to request (default /)")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn sync worker processes")
+    parser.add_argument("--threads", type=int, default=20, help="ASGI_THREADS for the uvicorn process")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--duration", type=float, default=5, help="Seconds per concurrency level")
+    parser.add_argument("--match-memory", action="store_true",
+                        help="Size the gunicorn worker count to the uvicorn process's memory (ignores --workers)")
+    args = parser.parse_args()
+
+    os.environ["ASGI_THREADS"] = str(args.threads)
+    uvicorn_rss = benchmark(
+        f"uvicorn asgi:asgi_app, 1 process x {args.threads} threads", uvicorn_command(), 8102, args
+    )
+
+    workers = workers_for_memory(uvicorn_rss, args.path) if args.match_memory else args.workers
+    benchmark(f"gunicorn, {workers} sync worker(s)", gunicorn_command(workers), 8101, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,9 +11,35 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Optional read replica: GET requests read from here, writes go to the primary
+    SQLALCHEMY_READ_REPLICA_URI = os.environ.get("DATABASE_READ_URL")
+    SQLALCHEMY_BINDS = {"replica": SQLALCHEMY_READ_REPLICA_URI} if SQLALCHEMY_READ_REPLICA_URI else {}
+    READ_YOUR_WRITES_SECONDS = int(os.environ.get("READ_YOUR_WRITES_SECONDS", 10))
+    REPLICA_SYNC_INTERVAL = int(os.environ.get("REPLICA_SYNC_INTERVAL", 0))  # 0 = sync once
+
+    # Threads serving requests in one process under the ASGI entry point (asgi.py)
+    ASGI_THREADS = int(os.environ.get("ASGI_THREADS", 20))
+
+    # Store session data in the database; the cookie only holds a session id
+    SERVER_SIDE_SESSIONS = os.environ.get("SERVER_SIDE_SESSIONS", "0") == "1"
+
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'static', 'uploads')
 
     ADMIN_USERNAME = os.environ.get("ADMIN_USERNAME", "admin")
     ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "admin123")
 
+    # Stream /projects and /contact instead of rendering the whole page first
+    STREAM_LIST_PAGES = os.environ.get("STREAM_LIST_PAGES", "1") == "1"
+    LIST_PAGE_BATCH_SIZE = 100
+
+    # How many "related projects" the precompute-projects job keeps per project
+    RELATED_PROJECTS_COUNT = 3
+
+    # Rendered project page fragments kept per process (0 turns caching off)
+    FRAGMENT_CACHE_SIZE = int(os.environ.get("FRAGMENT_CACHE_SIZE", 500))
+
+    # Replied-to contact messages older than this are moved to the archive
+    ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", 90))
+    ARCHIVE_BATCH_SIZE = 500
+
     MAX_CONTENT_LENGTH = 2 * 1024 * 1024  # 2MB limit
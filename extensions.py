@@ -1,5 +1,17 @@
+import sqlite3
 from flask_sqlalchemy import SQLAlchemy
 from flask_wtf.csrf import CSRFProtect
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 csrf = CSRFProtect()
+
+
+@event.listens_for(Engine, "connect")
+def _use_sqlite_wal(dbapi_connection, connection_record):
+    # Streamed list pages keep a read cursor open for the whole download.
+    # In WAL mode that doesn't stop comments and ratings from being written.
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
@@ -0,0 +1,146 @@
+import json
+import re
+import threading
+from collections import OrderedDict
+from flask import current_app, g, render_template
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from sqlalchemy import event, insert, select, update
+from extensions import db
+from models import FragmentVersion, Project, ProjectComment, ProjectRating, User
+from routing import RoutingSession
+
+# Fragment name -> model whose writes invalidate it (keyed by project id)
+PROJECT_FRAGMENTS = {
+    "body": Project,
+    "rating": ProjectRating,
+    "comments": ProjectComment,
+}
+
+HOLE_RE = re.compile(r"<!--hole:([\w-]+):(\{.*?\})-->")
+
+
+class FragmentCache:
+    """Small thread-safe LRU of rendered HTML fragments, local to this process."""
+
+    def __init__(self):
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys) -> dict:
+        with self._lock:
+            found = {}
+            for key in keys:
+                if key in self._items:
+                    self._items.move_to_end(key)
+                    found[key] = self._items[key]
+            return found
+
+    def set(self, key: str, html: str) -> None:
+        max_size = current_app.config["FRAGMENT_CACHE_SIZE"]
+        with self._lock:
+            self._items[key] = html
+            self._items.move_to_end(key)
+            while len(self._items) > max_size:
+                self._items.popitem(last=False)
+
+
+fragment_cache = FragmentCache()
+
+
+def load_project_fragments(project_id: int) -> dict:
+    """
+    Looks up the current version of each project fragment (one query) and
+    takes a snapshot of the cached HTML for this request. Returns
+    {fragment name: cache key}; check is_cached() before loading its data.
+    """
+    version_keys = {name: f"project-{name}:{project_id}" for name in PROJECT_FRAGMENTS}
+    versions = dict(db.session.execute(
+        select(FragmentVersion.key, FragmentVersion.version).where(FragmentVersion.key.in_(version_keys.values()))
+    ).all())
+
+    keys = {name: f"{key}:v{versions.get(key, 0)}" for name, key in version_keys.items()}
+    g.fragments = fragment_cache.get_many(keys.values())
+    return keys
+
+
+def is_cached(key: str) -> bool:
+    return key in g.get("fragments", {})
+
+
+def hole(name: str, **params) -> Markup:
+    """
+    Marks a per-visitor spot inside a cached fragment. It is filled by
+    rendering templates/fragments/<name>.html on every request.
+    """
+    return Markup(f"<!--hole:{name}:{json.dumps(params)}-->")
+
+
+def fill_holes(html: str) -> Markup:
+    def render(match):
+        return render_template(f"fragments/{match.group(1)}.html", **json.loads(match.group(2)))
+
+    return Markup(HOLE_RE.sub(render, html))
+
+
+class FragmentCacheExtension(Extension):
+    """
+    {% cache key %}...{% endcache %}: the block is rendered once per key and
+    served from the fragment cache afterwards. Use {{ hole(...) }} inside
+    it for anything that depends on the visitor.
+    """
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = parser.parse_expression()
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(self.call_method("_render", [key]), [], [], body).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        html = g.get("fragments", {}).get(key)
+        if html is None:
+            html = str(caller())
+            if current_app.config["FRAGMENT_CACHE_SIZE"]:
+                fragment_cache.set(key, html)
+        return fill_holes(html)
+
+
+def _bump(conn, key: str) -> None:
+    updated = conn.execute(
+        update(FragmentVersion).where(FragmentVersion.key == key).values(version=FragmentVersion.version + 1)
+    ).rowcount
+    if not updated:
+        conn.execute(insert(FragmentVersion).values(key=key, version=1))
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _invalidate_fragments(session, flush_context):
+    keys = set()
+    renamed_users = []
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        for name, model in PROJECT_FRAGMENTS.items():
+            if isinstance(obj, model):
+                keys.add(f"project-{name}:{obj.id if model is Project else obj.project_id}")
+        if isinstance(obj, User) and obj in session.dirty:
+            renamed_users.append(obj.id)
+
+    if not keys and not renamed_users:
+        return
+
+    conn = session.connection()
+    if renamed_users:
+        # Comment lists show the author's name
+        project_ids = conn.execute(
+            select(ProjectComment.project_id).where(ProjectComment.user_id.in_(renamed_users)).distinct()
+        ).scalars()
+        keys.update(f"project-comments:{pid}" for pid in project_ids)
+    for key in keys:
+        _bump(conn, key)
+
+
+def init_fragment_cache(app) -> None:
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.globals["hole"] = hole
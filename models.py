@@ -71,4 +71,32 @@ class ProjectRating(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     __table_args__ = (db.UniqueConstraint("project_id", "user_id", name="uq_project_user_rating"),)
     project = db.relationship("Project", backref=db.backref("ratings", lazy=True))
-    user = db.relationship("User", backref=db.backref("ratings", lazy=True))
\ No newline at end of file
+    user = db.relationship("User", backref=db.backref("ratings", lazy=True))
+
+class MessageArchive(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    rows = db.Column(db.Integer, nullable=False)
+    raw_bytes = db.Column(db.Integer, nullable=False)     # size of the uncompressed JSON
+    stored_bytes = db.Column(db.Integer, nullable=False)  # size of the compressed data
+    data = db.Column(db.LargeBinary, nullable=False)      # zlib-compressed JSON list of messages
+
+class ServerSession(db.Model):
+    id = db.Column(db.String(64), primary_key=True)
+    data = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class RelatedProject(db.Model):
+    project_id = db.Column(db.Integer, db.ForeignKey("project.id"), primary_key=True)
+    related_id = db.Column(db.Integer, db.ForeignKey("project.id"), primary_key=True)
+    score = db.Column(db.Float, nullable=False)
+
+class ProjectRanking(db.Model):
+    project_id = db.Column(db.Integer, db.ForeignKey("project.id"), primary_key=True)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    avg_rating = db.Column(db.Float, nullable=False, default=0, index=True)
+    comment_count = db.Column(db.Integer, nullable=False, default=0, index=True)
+
+class FragmentVersion(db.Model):
+    key = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
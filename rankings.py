@@ -0,0 +1,111 @@
+import math
+import re
+from collections import Counter
+from sqlalchemy import delete, event, func, insert, or_, select
+from extensions import db
+from models import Project, ProjectComment, ProjectRating, ProjectRanking, RelatedProject
+from routing import RoutingSession
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "using", "was", "with",
+}
+
+
+def _tokenize(text: str) -> list:
+    return [w for w in re.findall(r"[a-z0-9]+", (text or "").lower()) if len(w) > 1 and w not in STOP_WORDS]
+
+
+def _tfidf_vectors(docs: dict) -> dict:
+    """docs: {project_id: [tokens]} -> {project_id: {term: unit-length tf-idf weight}}"""
+    doc_freq = Counter(term for tokens in docs.values() for term in set(tokens))
+    n = len(docs)
+    vectors = {}
+    for pid, tokens in docs.items():
+        counts = Counter(tokens)
+        # Smoothed IDF: terms shared by every project still count a little
+        vec = {t: (c / len(tokens)) * (math.log((1 + n) / (1 + doc_freq[t])) + 1) for t, c in counts.items()}
+        norm = math.sqrt(sum(w * w for w in vec.values()))
+        vectors[pid] = {t: w / norm for t, w in vec.items()} if norm else {}
+    return vectors
+
+
+def compute_related_projects(per_project: int = 3) -> int:
+    """
+    Rebuilds RelatedProject from TF-IDF cosine similarity over each
+    project's title, overview and description. Returns rows written.
+    """
+    docs = {
+        p.id: _tokenize(" ".join(filter(None, (p.title, p.overview, p.description))))
+        for p in Project.query.all()
+    }
+    vectors = _tfidf_vectors(docs)
+
+    rows = []
+    for pid, vec in vectors.items():
+        scores = []
+        for other_id, other in vectors.items():
+            if other_id == pid:
+                continue
+            score = sum(w * other.get(t, 0.0) for t, w in vec.items())
+            if score > 0:
+                scores.append((score, other_id))
+        scores.sort(reverse=True)
+        rows += [{"project_id": pid, "related_id": oid, "score": s} for s, oid in scores[:per_project]]
+
+    db.session.execute(delete(RelatedProject))
+    if rows:
+        db.session.execute(insert(RelatedProject), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def _refresh_ranking(conn, project_id: int) -> None:
+    rating_count, avg_rating = conn.execute(
+        select(func.count(ProjectRating.id), func.avg(ProjectRating.rating)).where(ProjectRating.project_id == project_id)
+    ).one()
+    comment_count = conn.execute(
+        select(func.count(ProjectComment.id)).where(ProjectComment.project_id == project_id)
+    ).scalar()
+
+    conn.execute(delete(ProjectRanking).where(ProjectRanking.project_id == project_id))
+    conn.execute(insert(ProjectRanking).values(
+        project_id=project_id,
+        rating_count=rating_count,
+        avg_rating=round(float(avg_rating or 0), 2),
+        comment_count=comment_count,
+    ))
+
+
+def rebuild_rankings() -> int:
+    """Full refresh of ProjectRanking, e.g. after importing existing data."""
+    conn = db.session.connection()
+    conn.execute(delete(ProjectRanking))
+    project_ids = db.session.scalars(select(Project.id)).all()
+    for project_id in project_ids:
+        _refresh_ranking(conn, project_id)
+    db.session.commit()
+    return len(project_ids)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _refresh_touched_rankings(session, flush_context):
+    # Incremental refresh: only the projects whose ratings/comments changed
+    touched = {
+        obj.project_id
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(obj, (ProjectRating, ProjectComment)) and obj.project_id
+    }
+    # SQLite reuses the highest id, so a deleted project's rows would be
+    # inherited by the next project added
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Project)]
+
+    if touched or deleted:
+        conn = session.connection()
+        for project_id in touched.difference(deleted):
+            _refresh_ranking(conn, project_id)
+        if deleted:
+            conn.execute(delete(RelatedProject).where(
+                or_(RelatedProject.project_id.in_(deleted), RelatedProject.related_id.in_(deleted))
+            ))
+            conn.execute(delete(ProjectRanking).where(ProjectRanking.project_id.in_(deleted)))
@@ -0,0 +1,104 @@
+import sqlite3
+import time
+import click
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND = "replica"
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def _reads_from_replica() -> bool:
+    """
+    GET-style requests read from the replica, unless this visitor wrote
+    something recently (read-your-writes stickiness).
+    """
+    if not has_request_context() or request.method not in READ_METHODS:
+        return False
+    last_write = session.get("last_write_at")
+    if last_write is None:
+        return True
+    return time.time() - last_write > current_app.config["READ_YOUR_WRITES_SECONDS"]
+
+
+class RoutingSession(Session):
+    """
+    Sends default-bind reads to the "replica" bind on read requests.
+    Flushes and writes always go to the primary engine.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing:
+            # Cheap check first: without a replica there is nothing to decide
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None and _uses_default_bind(mapper) and _reads_from_replica():
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _uses_default_bind(mapper) -> bool:
+    # Models declared with their own __bind_key__ keep their engine
+    table = getattr(mapper, "local_table", None)
+    return table is None or table.metadata.info.get("bind_key") is None
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_write(sess, flush_context):
+    if has_request_context():
+        g.db_wrote = True
+
+
+def remember_writes(response):
+    """after_request hook: start the stickiness window for this visitor."""
+    if g.get("db_wrote"):
+        session["last_write_at"] = time.time()
+    return response
+
+
+def _sqlite_path(engine) -> str:
+    if engine.url.get_backend_name() != "sqlite" or engine.url.database in (None, "", ":memory:"):
+        raise ValueError("The stand-in replicator only supports file-based SQLite databases")
+    return engine.url.database
+
+
+def sync_replica(db) -> None:
+    """
+    Stand-in replicator: copies the primary SQLite file onto the replica
+    using SQLite's online backup API.
+    """
+    primary = sqlite3.connect(_sqlite_path(db.engines[None]))
+    replica = sqlite3.connect(_sqlite_path(db.engines[REPLICA_BIND]))
+    try:
+        primary.backup(replica)
+    finally:
+        replica.close()
+        primary.close()
+    # Pooled replica connections may hold an old snapshot
+    db.engines[REPLICA_BIND].dispose()
+
+
+def init_read_routing(app, db) -> None:
+    if REPLICA_BIND not in app.config.get("SQLALCHEMY_BINDS", {}):
+        return
+
+    app.after_request(remember_writes)
+
+    # A real replica only needs the bind; the SQLite stand-in is filled by
+    # running this command (once before serving, then as often as needed).
+    @app.cli.command("sync-replica")
+    def sync_replica_command():
+        """Copy the primary database onto the read replica (loop with REPLICA_SYNC_INTERVAL)."""
+        try:
+            _sqlite_path(db.engines[None])
+            _sqlite_path(db.engines[REPLICA_BIND])
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+        interval = app.config["REPLICA_SYNC_INTERVAL"]
+        while True:
+            sync_replica(db)
+            print("Replica synced.")
+            if not interval:
+                break
+            time.sleep(interval)
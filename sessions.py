@@ -0,0 +1,103 @@
+import secrets
+from datetime import datetime
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
+from sqlalchemy import delete, insert, select, update
+from models import ServerSession
+
+
+AUTH_KEYS = ("is_admin", "user_id")
+
+
+class ServerSideSession(SecureCookieSession):
+    def __init__(self, initial=None, sid=None):
+        super().__init__(initial)
+        self.sid = sid
+        self.auth_at_load = self.auth_state()
+
+    def auth_state(self) -> tuple:
+        return tuple(self.get(key) for key in AUTH_KEYS)
+
+
+class SqliteSessionInterface(SessionInterface):
+    """
+    Keeps session data in the ServerSession table, so the cookie only
+    carries a random session id. Requests without a cookie never touch
+    the database.
+    """
+
+    serializer = TaggedJSONSerializer()
+    table = ServerSession.__table__
+
+    def __init__(self, db):
+        self.db = db
+
+    def _engine(self):
+        # Always the primary: a session must see its own writes
+        return self.db.engines[None]
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if not sid:
+            return ServerSideSession()
+
+        with self._engine().connect() as conn:
+            row = conn.execute(
+                select(self.table.c.data, self.table.c.expires_at).where(self.table.c.id == sid)
+            ).first()
+
+        if row is None or row.expires_at < datetime.utcnow():
+            return ServerSideSession()
+        return ServerSideSession(self.serializer.loads(row.data), sid=sid)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        if not session:
+            if session.modified and session.sid:
+                with self._engine().begin() as conn:
+                    conn.execute(delete(self.table).where(self.table.c.id == session.sid))
+                response.delete_cookie(
+                    name, domain=domain, path=path, secure=secure, samesite=samesite, httponly=httponly
+                )
+            return
+
+        # Logging in or out gets a fresh id, so a planted session id
+        # never becomes an authenticated one (session fixation)
+        if session.sid and session.auth_state() != session.auth_at_load:
+            with self._engine().begin() as conn:
+                conn.execute(delete(self.table).where(self.table.c.id == session.sid))
+            session.sid = None
+
+        if not self.should_set_cookie(app, session):
+            return
+
+        expires = self.get_expiration_time(app, session)
+        now = datetime.utcnow()
+        row_expires = expires.replace(tzinfo=None) if expires else now + app.permanent_session_lifetime
+        values = {"data": self.serializer.dumps(dict(session)), "expires_at": row_expires}
+
+        with self._engine().begin() as conn:
+            updated = 0
+            if session.sid:
+                updated = conn.execute(
+                    update(self.table).where(self.table.c.id == session.sid).values(**values)
+                ).rowcount
+            if not updated:
+                session.sid = secrets.token_urlsafe(32)
+                # Clear out expired sessions while we are writing anyway
+                conn.execute(delete(self.table).where(self.table.c.expires_at < now))
+                conn.execute(insert(self.table).values(id=session.sid, **values))
+
+        response.set_cookie(
+            name, session.sid, expires=expires, httponly=httponly,
+            domain=domain, path=path, secure=secure, samesite=samesite,
+        )